@@ -1,13 +1,15 @@
 #!/usr/bin/env python3
-import json
+import atexit
 import time
+import math
 import os
 import threading
+import queue
 import subprocess
-import csv
+import numpy as np
+import orjson
 import zmq
-from datetime import datetime, timedelta
-from collections import deque
+from collections import OrderedDict
 
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -20,54 +22,140 @@ RESOURCES_DIR = os.path.join(CURRENT_DIR, 'tmp')
 LOG_FILE = os.path.join(RESOURCES_DIR, 'face_info_log.csv')
 
 MAX_HISTORY_SECONDS = 5.0
+CLEANUP_INTERVAL = 5.0  # Seconds between RecordManager.clean_old_records calls
 MAX_ROWS = 200
+MAX_SEEN_IDS = MAX_ROWS * 4  # Recently processed data IDs kept for de-duplication
+
+# Buffered CSV rows are flushed after this many rows or this many seconds,
+# whichever comes first. The CSV is only a post-mortem log.
+FLUSH_ROWS = 32
+FLUSH_INTERVAL = 0.2
+WRITE_QUEUE_SIZE = 1024  # Rows the receiver may run ahead of the CSV writer
 
 # We can store the CSV header somewhere
 CSV_HEADER = ['Timestamp', 'Rec_BufferSet', 'Detection_ID',
               'Gallery_ID', 'Label', 'Center_X', 'Center_Y']
+CSV_HEADER_LINE = ','.join(CSV_HEADER) + '\n'
+
+def format_csv_row(record):
+    """Format one record as a CSV line. None of the fields need quoting:
+    labels have their commas replaced before they get here."""
+    timestamp, offset, detection_id, gallery_id, label, center_x, center_y = record
+    return f"{timestamp},{offset},{detection_id},{gallery_id},{label},{center_x},{center_y}\n"
+
+# (whole second, formatted '%Y-%m-%d %H:%M:%S' prefix) for fast_timestamp
+_timestamp_cache = [None, ""]
+
+def fast_timestamp():
+    """Return the local time as '%Y-%m-%d %H:%M:%S.%f', only going through
+    strftime once per second."""
+    seconds, nanos = divmod(time.time_ns(), 1_000_000_000)
+    if seconds != _timestamp_cache[0]:
+        _timestamp_cache[0] = seconds
+        _timestamp_cache[1] = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(seconds))
+    return f"{_timestamp_cache[1]}.{nanos // 1000:06d}"
 
 class RecordManager:
     def __init__(self, max_records=200, max_age_seconds=5.0):
-        self.records = deque(maxlen=max_records)  # each item is (datetime_obj, row_data_list)
-        self.max_age = timedelta(seconds=max_age_seconds)
-        
+        # Ring buffer of the most recent records: monotonic_ns timestamps in a
+        # preallocated array plus the matching rows, oldest at self.head
+        self.max_records = max_records
+        self.timestamps = np.empty(max_records, dtype=np.int64)
+        self.rows = [None] * max_records
+        self.head = 0
+        self.count = 0
+        self.max_age_ns = int(max_age_seconds * 1_000_000_000)
+
+        # Keep a single buffered handle on the log for the whole session and
+        # write the header once up front
+        self.csvfile = open(LOG_FILE, 'w', newline='', buffering=1 << 16)
+        self.csvfile.write(CSV_HEADER_LINE)
+        self.csvfile.flush()
+
+        # The handle is owned by a writer thread so the ZMQ receiver never
+        # waits on disk. Queue items are a CSV line to append, or None to stop.
+        self.write_queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self.writer_thread = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer_thread.start()
+
     def add_record(self, record):
-        """Add a new record to the in-memory deque and write only that record to CSV."""
-        now = datetime.now()
-        self.records.append((now, record))
-        
+        """Add a new record to the in-memory window and queue it for the CSV."""
+        index = (self.head + self.count) % self.max_records
+        if self.count == self.max_records:
+            # Full: overwrite the oldest record
+            self.head = (self.head + 1) % self.max_records
+        else:
+            self.count += 1
+        self.timestamps[index] = time.monotonic_ns()
+        self.rows[index] = record
+
         # Append only the new record to CSV (for streaming)
-        with open(LOG_FILE, 'a', newline='') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(record)
-    
+        self.write_queue.put(format_csv_row(record))
+
+    def live_rows(self):
+        """Iterate over the records in the window, oldest first."""
+        for i in range(self.count):
+            yield self.rows[(self.head + i) % self.max_records]
+
+    def close(self):
+        """Write out everything still queued and close the log."""
+        self.write_queue.put(None)
+        self.writer_thread.join()
+        self.csvfile.close()
+
+    def _write_loop(self):
+        pending_rows = 0
+        last_flush = time.monotonic()
+        while True:
+            # Only wake up on a timer while there is something left to flush
+            timeout = None
+            if pending_rows:
+                timeout = max(0.0, last_flush + FLUSH_INTERVAL - time.monotonic())
+            try:
+                item = self.write_queue.get(timeout=timeout)
+            except queue.Empty:
+                item = ''
+
+            if item is None:
+                self.csvfile.flush()
+                return
+            if item:
+                self.csvfile.write(item)
+                pending_rows += 1
+
+            if pending_rows and (pending_rows >= FLUSH_ROWS or
+                                 time.monotonic() - last_flush >= FLUSH_INTERVAL):
+                self.csvfile.flush()
+                pending_rows = 0
+                last_flush = time.monotonic()
+
     def clean_old_records(self):
-        """Remove records older than max_age and rewrite the CSV if something changed."""
-        now = datetime.now()
-        old_len = len(self.records)
-        
-        # Pop from the left while the oldest record is too old
-        while self.records and (now - self.records[0][0]) > self.max_age:
-            self.records.popleft()
-        
-        new_len = len(self.records)
-        pruned_count = old_len - new_len
+        """Remove records older than max_age from the in-memory window.
+
+        The CSV is append-only and keeps the full session; readers that only
+        want the recent window can filter on the Timestamp column."""
+        cutoff = time.monotonic_ns() - self.max_age_ns
+
+        # Timestamps are ascending from head, so binary-search the first record
+        # still inside the window (in two parts if the live range wraps)
+        end = self.head + self.count
+        if end <= self.max_records:
+            pruned_count = int(np.searchsorted(self.timestamps[self.head:end], cutoff))
+        else:
+            first = self.timestamps[self.head:]
+            pruned_count = int(np.searchsorted(first, cutoff))
+            if pruned_count == len(first):
+                pruned_count += int(np.searchsorted(
+                    self.timestamps[:end - self.max_records], cutoff))
+
+        self.head = (self.head + pruned_count) % self.max_records
+        self.count -= pruned_count
         
-        # If we pruned anything, we must rewrite the CSV so disk matches memory
         if pruned_count > 0:
             print(f"Pruned {pruned_count} records")
 
-            # Re-write CSV with only current records
-            with open(LOG_FILE, 'w', newline='') as csvfile:
-                writer = csv.writer(csvfile)
-                # Optionally write header each time if you want a valid CSV
-                writer.writerow(CSV_HEADER)
-                # Now write the in-memory items
-                for _, row_data in self.records:
-                    writer.writerow(row_data)
-
         # Filter out 'nd' values when displaying unique IDs
-        unique_ids = set(r[3] for _, r in self.records if r[3] != 'nd')
+        unique_ids = set(r[3] for r in self.live_rows() if r[3] != 'nd')
         if unique_ids:  # Only print if there are valid IDs
             print(f"Current unique Gallery IDs in memory: {unique_ids}")
 
@@ -99,103 +187,158 @@ def calculate_center(bbox):
     center_y = (bbox["ymin"] + bbox["height"]/2) * IMAGE_HEIGHT
     return int(center_x), int(center_y)
 
+class FaceInfo:
+    """Fields extracted from one recognition record, plus the Gallery_ID and
+    Label strings as they are written to the CSV ('nd' when missing)."""
+    __slots__ = ('mode0_id', 'mode1_id', 'label', 'center_x', 'center_y',
+                 'gallery_id_str', 'label_str')
+
+    def __init__(self):
+        self.mode0_id = None
+        self.mode1_id = None
+        self.label = None
+        self.center_x = None
+        self.center_y = None
+        self.gallery_id_str = 'nd'
+        self.label_str = 'nd'
+
 def get_face_info(data):
-    face_info = {
-        'mode0_id': None,
-        'mode1_id': None,
-        'label': None,
-        'center_x': None,
-        'center_y': None
-    }
+    face_info = FaceInfo()
     
     try:
-        if "HailoROI" in data:
-            if "HailoBBox" in data["HailoROI"]:
-                bbox = data["HailoROI"]["HailoBBox"]
-                face_info['center_x'], face_info['center_y'] = calculate_center(bbox)
-            
-            for obj in data["HailoROI"].get("SubObjects", []):
-                if "HailoUniqueID" in obj:
-                    unique_id = obj["HailoUniqueID"]
-                    if unique_id["mode"] == 0:
-                        face_info['mode0_id'] = unique_id["unique_id"]
-                    elif unique_id["mode"] == 1:
-                        face_info['mode1_id'] = unique_id["unique_id"]
-                
-                if "HailoClassification" in obj:
-                    classification = obj["HailoClassification"]
-                    if classification["classification_type"] == "recognition_result":
-                        face_info['label'] = classification["label"]
+        roi = data.get("HailoROI")
+        if roi is None:
+            return face_info
+
+        bbox = roi.get("HailoBBox")
+        if bbox is not None:
+            face_info.center_x, face_info.center_y = calculate_center(bbox)
+
+        # Single pass over the sub-objects; stop as soon as both tracker IDs
+        # and the recognition label have been found
+        mode0_id = mode1_id = label = None
+        for obj in roi.get("SubObjects", ()):
+            unique_id = obj.get("HailoUniqueID")
+            if unique_id is not None:
+                mode = unique_id["mode"]
+                if mode == 0:
+                    mode0_id = unique_id["unique_id"]
+                elif mode == 1:
+                    mode1_id = unique_id["unique_id"]
+
+            classification = obj.get("HailoClassification")
+            if (classification is not None and
+                    classification["classification_type"] == "recognition_result"):
+                label = classification["label"]
+
+            if mode0_id is not None and mode1_id is not None and label is not None:
+                break
+
+        face_info.mode0_id = mode0_id
+        face_info.mode1_id = mode1_id
+        face_info.label = label
+
+        # Resolve the CSV representations once here so the emit path doesn't
+        # have to. Commas would break the unquoted CSV row.
+        face_info.gallery_id_str = mode1_id or 'nd'
+        face_info.label_str = (label or 'nd').replace(',', ';')
     except Exception as e:
         print(f"Error extracting face info: {str(e)}")
     
     return face_info
 
-def monitor_zmq():
-    """Monitor ZMQ socket for face recognition data."""
+def publish_detection(detections, detection):
+    """Put a detection on a bounded queue, dropping the oldest one when the
+    consumer has fallen behind instead of blocking the ZMQ receiver."""
+    while True:
+        try:
+            detections.put_nowait(detection)
+            return
+        except queue.Full:
+            try:
+                detections.get_nowait()
+            except queue.Empty:
+                pass
+
+def monitor_zmq(detections=None):
+    """Monitor ZMQ socket for face recognition data.
+
+    Every recorded detection is also handed to `detections` (a queue.Queue,
+    see publish_detection) as (Rec_BufferSet, Detection_ID, Gallery_ID,
+    Center_X, Center_Y) when one is given."""
     context = zmq.Context()
     socket = context.socket(zmq.SUB)
     socket.connect("tcp://localhost:5555")
     socket.setsockopt_string(zmq.SUBSCRIBE, "")  # Subscribe to all topics/messages
     
     record_manager = RecordManager(max_records=MAX_ROWS, max_age_seconds=MAX_HISTORY_SECONDS)
-    last_cleanup = datetime.now()
-    processed_data_ids = set()
-    
-    # Write CSV header initially
-    with open(LOG_FILE, 'w', newline='') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(CSV_HEADER)
+    # Also runs when the monitor is a daemon thread of tracking_motors
+    atexit.register(record_manager.close)
+    next_cleanup = time.monotonic() + CLEANUP_INTERVAL
+    # Insertion-ordered so the oldest IDs can be evicted one at a time
+    processed_data_ids = OrderedDict()
     
     print("Starting ZMQ-based face tracking...")
     
     while True:
         try:
-            # Non-blocking receive with 100ms poll
-            if socket.poll(100):
-                data = socket.recv_json()
+            # Sleep until data arrives or the next cleanup is due,
+            # instead of waking up on a fixed interval
+            timeout_ms = max(0, math.ceil((next_cleanup - time.monotonic()) * 1000))
+
+            if socket.poll(timeout_ms):
+                # Decode straight from the zmq frame, without copying it into bytes first
+                frame = socket.recv(flags=zmq.NOBLOCK, copy=False)
+                data = orjson.loads(frame.buffer)
                 data_id = f"{data.get('timestamp (ms)', '')}_${data.get('stream_id', '')}"
-                
+            
                 if data_id not in processed_data_ids:
                     face_info = get_face_info(data)
+                
+                    if face_info.mode0_id is not None:
+                        gallery_id = face_info.gallery_id_str
+                        label = face_info.label_str
                     
-                    if face_info['mode0_id'] is not None:
-                        gallery_id = face_info['mode1_id'] or 'nd'
-                        label = face_info['label'] or 'nd'
-                        
                         row = [
-                            datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f'),
+                            fast_timestamp(),
                             data['buffer_offset'],
-                            face_info['mode0_id'],
+                            face_info.mode0_id,
                             gallery_id,
                             label,
-                            face_info['center_x'],
-                            face_info['center_y']
+                            face_info.center_x,
+                            face_info.center_y
                         ]
-                        
+                    
                         record_manager.add_record(row)
-                        processed_data_ids.add(data_id)
-                        
+                        if detections is not None:
+                            publish_detection(detections, (data['buffer_offset'],
+                                                           face_info.mode0_id,
+                                                           gallery_id,
+                                                           face_info.center_x,
+                                                           face_info.center_y))
+                        processed_data_ids[data_id] = None
+                        if len(processed_data_ids) > MAX_SEEN_IDS:
+                            processed_data_ids.popitem(last=False)
+                    
                         if ENABLE_CONSOLE_PRINT:
                             print(f"New Data - Rec BufferSet {data['buffer_offset']}: "
-                                  f"DetID:{face_info['mode0_id']}, "
+                                  f"DetID:{face_info.mode0_id}, "
                                   f"GalleryID:{gallery_id}, "
                                   f"Label:{label}, "
-                                  f"X:{face_info['center_x']}, "
-                                  f"Y:{face_info['center_y']}")
-            
+                                  f"X:{face_info.center_x}, "
+                                  f"Y:{face_info.center_y}")
+        
             # Clean old records every 5 seconds
-            now = datetime.now()
-            if (now - last_cleanup).total_seconds() >= 5.0:
+            now = time.monotonic()
+            if now >= next_cleanup:
                 record_manager.clean_old_records()
-                # Optionally prune 'processed_data_ids' if too large
-                if len(processed_data_ids) > MAX_ROWS * 2:
-                    processed_data_ids.clear()
-                last_cleanup = now
-                
+                next_cleanup = now + CLEANUP_INTERVAL
+            
         except zmq.ZMQError as e:
             print(f"ZMQ error: {str(e)}")
             time.sleep(0.1)
+        except orjson.JSONDecodeError as e:
+            print(f"Invalid JSON from ZMQ: {str(e)}")
         except Exception as e:
             print(f"Unexpected error: {str(e)}")
             time.sleep(0.1)
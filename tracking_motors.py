@@ -1,18 +1,29 @@
 import time
-import csv
-import subprocess
+import math
 import threading
 import os
+import queue
+import struct
+import numpy as np
 from adafruit_servokit import ServoKit
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional; without it the servo math just runs as plain Python
+    def njit(*args, **kwargs):
+        return lambda func: func
 from datetime import datetime
+import monitor_detections
 
 # =============================
 # ========== SETTINGS ==========
 # =============================
-CSV_PATH = 'tmp/face_info_log.csv'
 IMAGE_WIDTH = 640
 IMAGE_HEIGHT = 360
-TARGET_GALLERY_ID = '1'
+TARGET_FACE_PATH = 'tmp/target_face.txt'
+DEFAULT_TARGET_GALLERY_ID = '1'  # Default face ID
+TARGET_GALLERY_ID = DEFAULT_TARGET_GALLERY_ID
+TARGET_CHECK_INTERVAL = 0.2  # Seconds between target_face.txt checks
 # import pandas as pd
 # unique_gallery_ids = pd.read_csv(LOG_FILE)['Gallery_ID'].unique()
 
@@ -25,15 +36,19 @@ DEADZONE_Y = 40
 
 K_P = 0.5
 SERVO_STEP = 1.5
+MIN_STEP = 0.5  # Smallest angle change worth an I2C write (~servo resolution)
 
 CENTRE_X = IMAGE_WIDTH // 2
 CENTRE_Y = IMAGE_HEIGHT // 2
 
+DETECTION_QUEUE_SIZE = 64  # Detections buffered between the monitor thread and track_face
+
 DETECTION_WINDOW = 1.0  # 1 second window for conflict detection
 CONFLICT_THRESHOLD = 3  # Number of conflicts needed to trigger resolution
+CONFLICT_HISTORY = 256  # Detections kept per gallery ID for conflict detection
 
 # Add these after other global variables
-detection_conflicts = {}  # {gallery_id: [(timestamp, detection_id, x, y), ...]}
+detection_conflicts = {}  # {gallery_id: ConflictWindow}
 current_override = None  # Store current override detection_id if any
 
 # =============================
@@ -46,17 +61,23 @@ kit.servo[1].set_pulse_width_range(400, 2600)
 kit.servo[2].set_pulse_width_range(400, 2600)
 kit.servo[3].set_pulse_width_range(400, 2600)
 
+# Channels 0-3 are written straight to the PCA9685 in a single I2C burst instead
+# of one transaction per `servo.angle` assignment. Their ON/OFF registers are
+# contiguous from LED0_ON_L, and ServoKit already enables register
+# auto-increment when it sets the PWM frequency.
+PCA9685_LED0_ON_L = 0x06
+_PCA_DEVICE = kit._pca.i2c_device
+_PWM_REGS = struct.Struct('<HH')  # ON, OFF counts of one channel
+_pwm_burst = bytearray(1 + 4 * _PWM_REGS.size)
+_pwm_burst[0] = PCA9685_LED0_ON_L
+# (min_duty, duty_range, actuation_range) per channel, as set_pulse_width_range left them
+# (setup only; the hot path never goes through the servo objects)
+_pulse_ranges = [(s._min_duty, s._duty_range, s.actuation_range)
+                 for s in (kit.servo[0], kit.servo[1], kit.servo[2], kit.servo[3])]
+
 # =============================
 # ========== FUNCTIONS =========
 # =============================
-def set_arm_position(kit_instance, angle):
-    """Linked control for servo2 & servo3, so that when servo3 moves forward,
-    servo2 moves backward. The 'angle' must be between 0 and 180."""
-    if angle < 0 or angle > 180:
-        raise ValueError("Angle must be between 0 and 180 degrees.")
-    kit_instance.servo[3].angle = angle
-    kit_instance.servo[2].angle = 180 - angle
-
 deadzones = {
     'servo0': (999, -1),
     'servo1': (999, -1),
@@ -69,15 +90,59 @@ def in_deadzone(angle, deadzone):
         return dz_min <= angle <= dz_max
     return False
 
-def set_servo_angle_with_deadzone(servo_index, angle, deadzone_key):
-    angle = max(0, min(180, angle))
-    if not in_deadzone(angle, deadzones[deadzone_key]):
-        kit.servo[servo_index].angle = angle
+# Last angle actually sent over I2C, per deadzone key. Changes smaller than
+# MIN_STEP are skipped; since the comparison is against the last *written*
+# angle, small steps still accumulate into a write.
+last_written = {
+    'servo0': None,
+    'servo1': None,
+    'arm':    None
+}
+
+def needs_write(angle, key):
+    last = last_written[key]
+    return last is None or abs(angle - last) >= MIN_STEP
+
+def stage_channel(channel, angle):
+    """
+    Puts the pulse for `angle` into the burst buffer for `channel` (0-3), using
+    the same duty cycle `servo.angle = angle` would. Nothing is sent until
+    flush_channels().
+    """
+    min_duty, duty_range, actuation_range = _pulse_ranges[channel]
+    duty = min_duty + int(angle / actuation_range * duty_range)
+    if duty >= 0xFFFF:
+        on, off = 0x1000, 0  # full on
+    elif duty < 0x0010:
+        on, off = 0, 0x1000  # full off
+    else:
+        on, off = 0, duty >> 4
+    _PWM_REGS.pack_into(_pwm_burst, 1 + channel * _PWM_REGS.size, on, off)
+
+def flush_channels():
+    """Writes the staged pulses of channels 0-3 in one I2C transaction."""
+    with _PCA_DEVICE:
+        _PCA_DEVICE.write(_pwm_burst)
+
+def set_servo_angle_with_deadzone(channel, angle, deadzone_key):
+    """Stages `angle` for `channel`; returns True if a flush is needed."""
+    angle = angle if 0 <= angle <= 180 else (0 if angle < 0 else 180)
+    if not in_deadzone(angle, deadzones[deadzone_key]) and needs_write(angle, deadzone_key):
+        stage_channel(channel, angle)
+        last_written[deadzone_key] = angle
+        return True
+    return False
 
 def set_arm_angle_with_deadzone(angle):
-    angle = max(0, min(180, angle))
-    if not in_deadzone(angle, deadzones['arm']):
-        set_arm_position(kit, angle)
+    """Stages the arm `angle`; returns True if a flush is needed."""
+    angle = angle if 0 <= angle <= 180 else (0 if angle < 0 else 180)
+    if not in_deadzone(angle, deadzones['arm']) and needs_write(angle, 'arm'):
+        # Linked servo2 & servo3: when servo3 moves forward, servo2 moves backward
+        stage_channel(3, angle)
+        stage_channel(2, 180 - angle)
+        last_written['arm'] = angle
+        return True
+    return False
 
 # ===========================
 # ====== CONTROL LOGIC =======
@@ -86,119 +151,127 @@ servo0_angle = INITIAL_SERVO0_ANGLE
 servo1_angle = INITIAL_SERVO1_ANGLE
 arm_angle = INITIAL_ARM_ANGLE
 
-kit.servo[0].angle = servo0_angle
-kit.servo[1].angle = servo1_angle
-set_arm_position(kit, arm_angle)
-
-def adjust_servo_angles_using_old_logic(target_x, target_y):
-    
-    global servo0_angle, servo1_angle, arm_angle
+# Fill every slot of the burst buffer before the first flush
+stage_channel(0, servo0_angle)
+stage_channel(1, servo1_angle)
+stage_channel(3, arm_angle)
+stage_channel(2, 180 - arm_angle)
+flush_channels()
+last_written.update(servo0=servo0_angle, servo1=servo1_angle, arm=arm_angle)
 
+@njit(cache=True)
+def compute_servo_step(servo0, servo1, arm, target_x, target_y):
+    """
+    Pure math of one tracking update, without touching the servos.
+    Returns the new (servo0, servo1, arm) angles and whether servo0 moved;
+    when it didn't, the arm angle is the one to apply instead.
+    """
     error_x = CENTRE_X - target_x
     error_y = CENTRE_Y - target_y
 
-    # Horizontal servo1
-    if abs(error_x) > DEADZONE_X:
-        delta_servo1 = K_P * error_x
-        delta_servo1 = max(-SERVO_STEP, min(SERVO_STEP, delta_servo1))
-    else:
-        delta_servo1 = 0
-
-    # Vertical servo0
-    if abs(error_y) > DEADZONE_Y:
-        delta_servo0 = K_P * error_y
-        delta_servo0 = max(-SERVO_STEP, min(SERVO_STEP, delta_servo0))
-    else:
-        delta_servo0 = 0
-
-    new_servo1_angle = servo1_angle + delta_servo1
-    new_servo0_angle = servo0_angle - delta_servo0
+    # Proportional step limited to +/-SERVO_STEP, zeroed inside the deadzone
+    # (horizontal servo1, vertical servo0)
+    delta_servo1 = max(-SERVO_STEP, min(SERVO_STEP, K_P * error_x)) if abs(error_x) > DEADZONE_X else 0.0
+    delta_servo0 = max(-SERVO_STEP, min(SERVO_STEP, K_P * error_y)) if abs(error_y) > DEADZONE_Y else 0.0
 
     # Clamp angles
-    new_servo1_angle = max(0, min(180, new_servo1_angle))
-    new_servo0_angle = max(0, min(180, new_servo0_angle))
+    new_servo1 = max(0.0, min(180.0, servo1 + delta_servo1))
+    new_servo0 = max(0.0, min(180.0, servo0 - delta_servo0))
 
-    # Check if servo0 can move
-    servo0_moved = True
-    if (delta_servo0 < 0 and new_servo0_angle <= 0):
-        servo0_moved = False
-    elif (delta_servo0 > 0 and new_servo0_angle >= 180):
-        servo0_moved = False
+    # servo0 can't move when it is pushed further into one of its limits;
+    # the arm takes a step in the same direction instead
+    servo0_moved = not ((delta_servo0 < 0 and new_servo0 <= 0) or
+                        (delta_servo0 > 0 and new_servo0 >= 180))
 
-    new_arm_angle = arm_angle
+    new_arm = arm
     if not servo0_moved:
-        # servo0 is at a limit, move the arm
-        if delta_servo0 < 0 and new_servo0_angle <= 0:
-            arm_delta = -SERVO_STEP
-            new_arm_angle = max(0, arm_angle + arm_delta)
-        elif delta_servo0 > 0 and new_servo0_angle >= 180:
-            arm_delta = SERVO_STEP
-            new_arm_angle = min(180, arm_angle + arm_delta)
-    else:
-        servo0_angle = new_servo0_angle
+        new_arm = max(0.0, min(180.0, arm + math.copysign(SERVO_STEP, delta_servo0)))
+
+    return new_servo0, new_servo1, new_arm, servo0_moved
+
+def adjust_servo_angles_using_old_logic(target_x, target_y):
+    
+    global servo0_angle, servo1_angle, arm_angle
+
+    # Always pass floats so the jitted function keeps a single signature
+    new_servo0_angle, new_servo1_angle, new_arm_angle, servo0_moved = compute_servo_step(
+        float(servo0_angle), float(servo1_angle), float(arm_angle),
+        float(target_x), float(target_y))
 
     # Set servo1
-    set_servo_angle_with_deadzone(1, new_servo1_angle, 'servo1')
+    changed = set_servo_angle_with_deadzone(1, new_servo1_angle, 'servo1')
     servo1_angle = new_servo1_angle
 
     # If servo0 moved, update it. Otherwise move arm.
     if servo0_moved:
-        set_servo_angle_with_deadzone(0, servo0_angle, 'servo0')
+        servo0_angle = new_servo0_angle
+        changed |= set_servo_angle_with_deadzone(0, servo0_angle, 'servo0')
     else:
-        set_arm_angle_with_deadzone(new_arm_angle)
+        changed |= set_arm_angle_with_deadzone(new_arm_angle)
         arm_angle = new_arm_angle
 
+    if changed:
+        flush_channels()
+
+# Compile up front rather than on the first detection
+compute_servo_step(float(servo0_angle), float(servo1_angle), float(arm_angle),
+                   float(CENTRE_X), float(CENTRE_Y))
+
 # =============================
-# === CSV-BASED DETECTION ====
+# ===== DETECTION INTAKE =====
 # =============================
 
-def start_monitor_detection():
+def start_monitor_detection(detections):
     """
-    Launches the face-detection script in the background. 
+    Starts the face recognition pipeline and the ZMQ monitor in background
+    threads of this process. The monitor feeds every detection into `detections`.
     """
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    monitor_script = os.path.join(current_dir, 'monitor_detections.py')
-    subprocess.Popen(['python3', monitor_script])
-    print(f"Started monitor_detection.py from: {monitor_script}")
+    monitor_detections.clear_file(monitor_detections.LOG_FILE)
+    threading.Thread(target=monitor_detections.run_bash_script, daemon=True).start()
+    threading.Thread(target=monitor_detections.monitor_zmq, args=(detections,),
+                     daemon=True).start()
+    print("Started face recognition pipeline and detection monitor threads")
 
-def get_latest_csv_row(csv_path):
+class ConflictWindow:
     """
-    Reads the CSV, returns the row with the largest Rec_BufferSet
-    (the second column). If no data, returns None.
+    Preallocated ring buffer of the recent (timestamp, detection_id, x, y)
+    samples for one gallery ID, oldest first. Every sample is stored twice,
+    at i and i + size, so the live entries are always the contiguous slice
+    [start:start + count] and can be read as views.
     """
-    try:
-        with open(csv_path, 'r') as f:
-            rows = list(csv.reader(f))
-        if len(rows) <= 1:
-            return None  # only header or empty file
-
-        header = rows[0]
-        data_lines = rows[1:]
-        
-        # The second column is 'Rec_BufferSet' => index=1
-        # We'll parse it as an integer and find the maximum
-        valid_lines = []
-        for row in data_lines:
-            # row format: 
-            # [Timestamp, Rec_BufferSet, Detection_ID, Gallery_ID, Label, Center_X, Center_Y]
-            try:
-                offset_int = int(row[1])  # convert Rec_BufferSet to int
-                valid_lines.append((offset_int, row))
-            except:
-                # skip invalid rows
-                pass
-
-        if not valid_lines:
-            return None
-        
-        # Sort by offset ascending, last item has the largest offset
-        valid_lines.sort(key=lambda x: x[0])
-        max_offset, max_row = valid_lines[-1]
-        return max_row
-    except FileNotFoundError:
-        return None
-    except:
-        return None
+    def __init__(self, size=CONFLICT_HISTORY):
+        self.size = size
+        self.times = np.zeros(2 * size, dtype=np.float64)
+        self.det_ids = np.zeros(2 * size, dtype=np.int64)
+        self.xs = np.zeros(2 * size, dtype=np.float32)
+        self.ys = np.zeros(2 * size, dtype=np.float32)
+        self.start = 0  # oldest live slot
+        self.count = 0
+
+    def add(self, timestamp, detection_id, x, y):
+        if self.count == self.size:
+            # Full: the oldest sample makes room
+            self.start = (self.start + 1) % self.size
+            self.count -= 1
+        i = (self.start + self.count) % self.size
+        j = i + self.size
+        self.times[i] = self.times[j] = timestamp
+        self.det_ids[i] = self.det_ids[j] = detection_id
+        self.xs[i] = self.xs[j] = x
+        self.ys[i] = self.ys[j] = y
+        self.count += 1
+
+    def expire(self, current_time):
+        """Drops the samples at least DETECTION_WINDOW old, from the front."""
+        times = self.times
+        while self.count and current_time - times[self.start] >= DETECTION_WINDOW:
+            self.start = (self.start + 1) % self.size
+            self.count -= 1
+
+    def live(self):
+        """Views of the live (detection_ids, xs, ys)."""
+        s = slice(self.start, self.start + self.count)
+        return self.det_ids[s], self.xs[s], self.ys[s]
 
 def check_detection_conflicts(gallery_id, detection_id, center_x, center_y):
     """
@@ -206,117 +279,95 @@ def check_detection_conflicts(gallery_id, detection_id, center_x, center_y):
     Returns the detection_id to track
     """
     global detection_conflicts, current_override
-    current_time = time.time()
-    
-    # Initialize or clean old entries
-    if gallery_id not in detection_conflicts:
-        detection_conflicts[gallery_id] = []
+    # Monotonic, so samples stay in time order and expire from the front
+    current_time = time.monotonic()
     
-    # Remove old entries (older than DETECTION_WINDOW)
-    detection_conflicts[gallery_id] = [
-        entry for entry in detection_conflicts[gallery_id]
-        if current_time - entry[0] < DETECTION_WINDOW
-    ]
+    window = detection_conflicts.get(gallery_id)
+    if window is None:
+        window = detection_conflicts[gallery_id] = ConflictWindow()
     
-    # Add new detection
-    detection_conflicts[gallery_id].append((current_time, detection_id, center_x, center_y))
+    # Drop what fell out of DETECTION_WINDOW, then add the new detection
+    window.expire(current_time)
+    window.add(current_time, detection_id, center_x, center_y)
     
-    # Check for conflicts in the current window
-    recent_detections = detection_conflicts[gallery_id]
-    unique_detection_ids = set(entry[1] for entry in recent_detections)
+    # Group the entries inside DETECTION_WINDOW by detection_id
+    recent_ids, recent_xs, recent_ys = window.live()
+    unique_detection_ids, group = np.unique(recent_ids, return_inverse=True)
     
     # If we have conflicts and enough samples
-    if len(unique_detection_ids) > 1 and len(recent_detections) >= CONFLICT_THRESHOLD:
-        # Group detections by detection_id
-        detection_groups = {}
-        for entry in recent_detections:
-            _, det_id, x, y = entry
-            if det_id not in detection_groups:
-                detection_groups[det_id] = []
-            detection_groups[det_id].append((x, y))
-        
-        # Find the detection_id closest to center
-        closest_id = None
-        min_distance = float('inf')
-        
-        for det_id, positions in detection_groups.items():
-            # Calculate average position for this detection_id
-            avg_x = sum(x for x, _ in positions) / len(positions)
-            avg_y = sum(y for y, _ in positions) / len(positions)
-            
-            # Calculate distance to center
-            distance = ((avg_x - CENTRE_X) ** 2 + (avg_y - CENTRE_Y) ** 2) ** 0.5
-            
-            if distance < min_distance:
-                min_distance = distance
-                closest_id = det_id
+    if len(unique_detection_ids) > 1 and len(recent_ids) >= CONFLICT_THRESHOLD:
+        # Average position per detection_id, then the one closest to center
+        group_sizes = np.bincount(group)
+        avg_x = np.bincount(group, weights=recent_xs) / group_sizes
+        avg_y = np.bincount(group, weights=recent_ys) / group_sizes
+        distance = (avg_x - CENTRE_X) ** 2 + (avg_y - CENTRE_Y) ** 2
+        closest_id = int(unique_detection_ids[np.argmin(distance)])
         
         current_override = closest_id
         print(f"Conflict detected for Gallery ID {gallery_id}. Using closest Detection ID: {closest_id}")
         return closest_id
     
     # If no conflicts in window, clear override
-    if len(unique_detection_ids) == 1 and current_override:
+    if len(unique_detection_ids) == 1 and current_override is not None:
         print(f"Conflict resolved for Gallery ID {gallery_id}. Returning to normal tracking.")
         current_override = None
     
     return detection_id
 
-def track_face():
+def track_face(detections):
     """
-    Modified track_face function with conflict detection
+    Follows the detections handed over by the monitor thread, with conflict detection
     """
     global TARGET_GALLERY_ID
     last_offset = -1
-    x_last = None
-    y_last = None
+    next_target_check = 0.0
 
     while True:
         try:
-            TARGET_GALLERY_ID = get_target_face_id()
-            
-            latest_row = get_latest_csv_row(CSV_PATH)
-            if latest_row is not None:
-                timestamp_str = latest_row[0]
-                offset_str = latest_row[1]
-                detection_id = latest_row[2]
-                gallery_id = latest_row[3]
-                label = latest_row[4]
-                center_x_str = latest_row[5]
-                center_y_str = latest_row[6]
-
-                if (gallery_id == TARGET_GALLERY_ID and 
-                    detection_id not in [None, '', 'null'] and
-                    center_x_str not in [None, '', 'null'] and
-                    center_y_str not in [None, '', 'null']):
-                    
-                    try:
-                        offset_int = int(offset_str)
-                        center_x = float(center_x_str)
-                        center_y = float(center_y_str)
-                        
-                        # Check for detection conflicts
-                        tracked_detection_id = check_detection_conflicts(
-                            gallery_id, detection_id, center_x, center_y)
-                        
-                        # Only process if this is the detection ID we want to track
-                        if tracked_detection_id == detection_id:
-                            if offset_int > last_offset:
-                                last_offset = offset_int
-                                x_last = center_x
-                                y_last = center_y
-                                adjust_servo_angles_using_old_logic(x_last, y_last)
-                    except:
-                        offset_int = -1
-                        center_x, center_y = None, None
-            
-            time.sleep(0.01)
+            # Block until the monitor hands over a detection, then take whatever
+            # else piled up while the servos were moving. publish_detection also
+            # pops from a full queue, so qsize() can't be trusted as a count.
+            batch = [detections.get()]
+            while True:
+                try:
+                    batch.append(detections.get_nowait())
+                except queue.Empty:
+                    break
+
+            # The target changes on human timescales, so don't check it every batch
+            now = time.monotonic()
+            if now >= next_target_check:
+                TARGET_GALLERY_ID = get_target_face_id()
+                next_target_check = now + TARGET_CHECK_INTERVAL
+            target = None
+
+            for offset_int, detection_id, gallery_id, center_x, center_y in batch:
+                # Compare the gallery ID the same way it appears in the CSV
+                # log; detection IDs stay ints for the conflict window
+                gallery_id = str(gallery_id)
+
+                if (gallery_id == TARGET_GALLERY_ID and
+                    center_x is not None and
+                    center_y is not None):
+
+                    # Every detection still goes through the conflict window
+                    tracked_detection_id = check_detection_conflicts(
+                        gallery_id, detection_id, center_x, center_y)
+
+                    # Only process if this is the detection ID we want to track
+                    if tracked_detection_id == detection_id and offset_int > last_offset:
+                        last_offset = offset_int
+                        target = (center_x, center_y)
+
+            # Drive the servos once, towards the newest accepted position
+            if target is not None:
+                adjust_servo_angles_using_old_logic(*target)
 
         except KeyboardInterrupt:
             print("\nTracking stopped by user.")
             break
         except Exception as e:
-            print(f"Error reading CSV: {e}")
+            print(f"Error processing detection: {e}")
             time.sleep(0.1)
 
 def cleanup_servos():
@@ -325,35 +376,63 @@ def cleanup_servos():
     steps = 10
     delay = 0.01
 
-    for i in range(steps):
-        servo0_angle += (target0 - servo0_angle) / (steps - i)
-        servo1_angle += (target1 - servo1_angle) / (steps - i)
-        arm_angle += (targetA - arm_angle) / (steps - i)
-        
-        set_servo_angle_with_deadzone(0, servo0_angle, 'servo0')
-        set_servo_angle_with_deadzone(1, servo1_angle, 'servo1')
-        set_arm_angle_with_deadzone(arm_angle)
-        time.sleep(delay)
+    # Evenly spaced trajectories from the current angles to the targets,
+    # excluding the starting point
+    traj0 = np.linspace(servo0_angle, target0, steps + 1)[1:].tolist()
+    traj1 = np.linspace(servo1_angle, target1, steps + 1)[1:].tolist()
+    trajA = np.linspace(arm_angle, targetA, steps + 1)[1:].tolist()
+
+    # Steps are scheduled against a deadline, so the I2C write time is part
+    # of each step's delay rather than added on top of it
+    deadline = time.monotonic()
+    for servo0_angle, servo1_angle, arm_angle in zip(traj0, traj1, trajA):
+        changed = set_servo_angle_with_deadzone(0, servo0_angle, 'servo0')
+        changed |= set_servo_angle_with_deadzone(1, servo1_angle, 'servo1')
+        changed |= set_arm_angle_with_deadzone(arm_angle)
+        if changed:
+            flush_channels()
+        deadline += delay
+        time.sleep(max(0.0, deadline - time.monotonic()))
 
 def main():
     try:
-        start_monitor_detection()
+        detections = queue.Queue(maxsize=DETECTION_QUEUE_SIZE)
+        start_monitor_detection(detections)
         # Give it time to spin up
         time.sleep(2)
-        print("Starting CSV-based face tracking with Rec_BufferSet logic...")
-        track_face()
+        print("Starting face tracking with Rec_BufferSet logic...")
+        track_face(detections)
     except KeyboardInterrupt:
         print("Interrupted by user.")
     finally:
         print("Cleaning up servo positions...")
         cleanup_servos()
 
+# (st_mtime_ns, st_size) of target_face.txt when it was last read, and its contents
+_target_stat = None
+_target_cached = DEFAULT_TARGET_GALLERY_ID
+
 def get_target_face_id():
+    """
+    Returns the gallery ID in target_face.txt, or the default if the file is
+    missing. The file is only re-read when a stat shows it has changed.
+    """
+    global _target_stat, _target_cached
     try:
-        with open('tmp/target_face.txt', 'r') as f:
-            return f.read().strip()
-    except:
-        return '1'  # Default face ID
+        st = os.stat(TARGET_FACE_PATH)
+    except OSError:
+        _target_stat = None
+        return DEFAULT_TARGET_GALLERY_ID
+
+    stat_key = (st.st_mtime_ns, st.st_size)
+    if stat_key != _target_stat:
+        try:
+            with open(TARGET_FACE_PATH, 'r') as f:
+                _target_cached = f.read().strip()
+        except OSError:
+            return DEFAULT_TARGET_GALLERY_ID
+        _target_stat = stat_key
+    return _target_cached
 
 # Update the target face ID
 TARGET_GALLERY_ID = get_target_face_id()